@@ -1,4 +1,6 @@
+from collections.abc import Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 
 from langgraph.pregel import Pregel
 
@@ -8,24 +10,47 @@ from schema import AgentInfo
 DEFAULT_AGENT = "research-assistant"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Agent:
     description: str
     graph: Pregel
 
 
-agents: dict[str, Agent] = {
-    "research-assistant": Agent(
-        description="A research assistant with web search and calculator.", graph=research_assistant
-    )
-}
+# Read-only view, the registry must not change after import (the agent info is cached)
+agents: Mapping[str, Agent] = MappingProxyType(
+    {
+        "research-assistant": Agent(
+            description="A research assistant with web search and calculator.",
+            graph=research_assistant,
+        )
+    }
+)
+
+# The registry is static after import, so the agent info is only built once.
+_AGENT_INFO: tuple[AgentInfo, ...] = tuple(
+    AgentInfo(key=agent_id, description=agent.description) for agent_id, agent in agents.items()
+)
 
 
 def get_agent(agent_id: str) -> Pregel:
-    return agents[agent_id].graph
+    """Return the agent's graph, raising a KeyError if no agent is registered under agent_id."""
+    graph = get_agent_or_none(agent_id)
+    if graph is None:
+        raise KeyError(agent_id)
+    return graph
+
+
+def get_agent_or_none(agent_id: str) -> Pregel | None:
+    """Return the agent's graph, or None if no agent is registered under agent_id."""
+    agent = agents.get(agent_id)
+    return agent.graph if agent else None
+
 
+def get_all_agent_info() -> tuple[AgentInfo, ...]:
+    """
+    Return info about all registered agents.
 
-def get_all_agent_info() -> list[AgentInfo]:
-    return [
-        AgentInfo(key=agent_id, description=agent.description) for agent_id, agent in agents.items()
-    ]
+    The same pre-built tuple is returned on every call, so callers must not mutate the
+    AgentInfo objects in it.
+    """
+    return _AGENT_INFO
@@ -1,4 +1,6 @@
+import os
 from enum import StrEnum
+from functools import cached_property
 from typing import Annotated, Any
 
 from dotenv import find_dotenv
@@ -15,10 +17,28 @@ class DatabaseType(StrEnum):
     POSTGRES = "postgres"
 
 
+def _find_env_file() -> str | None:
+    """
+    Locate the .env file to load settings from.
+
+    ENV_FILE points at a known file (an empty value disables .env loading). When MODE is
+    set to "deployment" in the environment, the configuration is expected to come from the
+    environment itself, so the directory walk of find_dotenv() is skipped.
+    """
+    if "ENV_FILE" in os.environ:
+        return os.environ["ENV_FILE"] or None
+    if os.environ.get("MODE") == "deployment":
+        return None
+    return find_dotenv() or None
+
+
+_ENV_FILE = _find_env_file()
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
-        env_file=find_dotenv(),
-        env_file_encoding="utf-8",
+        env_file=_ENV_FILE,
+        env_file_encoding="utf-8" if _ENV_FILE else None,
         env_ignore_empty=True,
         extra="ignore",
         validate_default=False,
@@ -27,6 +47,12 @@ class Settings(BaseSettings):
 
     HOST: str = "0.0.0.0"
     PORT: int = 8080
+    # Number of server worker processes. Ignored in dev mode, which uses hot reload.
+    WORKERS: int = 1
+
+    # Origins allowed to call the API from a browser, as a JSON list. With an explicit list
+    # of origins, credentialed (cookie) requests are allowed too.
+    CORS_ORIGINS: list[str] = ["*"]
 
     # API Key Authentication - set this in .env file or environment variables
     AUTH_SECRET: SecretStr | None = Field(
@@ -39,6 +65,11 @@ class Settings(BaseSettings):
     LANGFUSE_SECRET_KEY: SecretStr | None = None
     LANGFUSE_HOST: str | None = None
 
+    # Cache of /invoke responses for stateless calls (no thread_id and no agent_config).
+    # Responses are reused for INVOKE_CACHE_TTL seconds. 0 disables the cache.
+    INVOKE_CACHE_TTL: int = 0
+    INVOKE_CACHE_MAX_SIZE: int = 1024
+
     # Database Configuration
     DATABASE_TYPE: DatabaseType = (
         DatabaseType.SQLITE
@@ -51,9 +82,13 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str | None = None
     POSTGRES_PORT: int | None = None
     POSTGRES_DB: str | None = None
+    # Connection pool size per worker process. When POSTGRES_POOL_MAX is not set, a total
+    # of 20 connections is split between the workers.
+    POSTGRES_POOL_MIN: int = 2
+    POSTGRES_POOL_MAX: int | None = None
 
     @computed_field  # type: ignore[prop-decorator]
-    @property
+    @cached_property
     def BASE_URL(self) -> str:
         return f"http://{self.HOST}:{self.PORT}"
 
@@ -1,54 +1,123 @@
-from typing import Optional
-import os
+import atexit
+import functools
 import logging
+import os
+from types import MappingProxyType
+
+from langfuse import Langfuse
 from langfuse.callback import CallbackHandler
-from core import settings
 from pydantic import SecretStr
 
+from core import settings
+
 logger = logging.getLogger(__name__)
 
-def get_langfuse_callback(user_id: Optional[str] = None, session_id: Optional[str] = None) -> Optional[CallbackHandler]:
+
+# Snapshot of the Langfuse environment variables, taken once at import. Re-reading the
+# environment at runtime is not meaningful for a long-running service.
+_ENV = MappingProxyType(
+    {
+        key: os.environ.get(key)
+        for key in ("LANGFUSE_PUBLIC_KEY", "LANGFUSE_SECRET_KEY", "LANGFUSE_HOST")
+    }
+)
+
+
+def _resolve() -> tuple[str | None, str | None, str]:
+    """Resolve the Langfuse credentials from environment variables or settings."""
+    # In deployment mode, we still want to enable telemetry if credentials are available
+    # Get Langfuse credentials from environment variables or settings
+    public_key = _ENV["LANGFUSE_PUBLIC_KEY"] or getattr(settings, "LANGFUSE_PUBLIC_KEY", None)
+    secret_key = _ENV["LANGFUSE_SECRET_KEY"] or getattr(settings, "LANGFUSE_SECRET_KEY", None)
+    host = _ENV["LANGFUSE_HOST"] or getattr(settings, "LANGFUSE_HOST", None) or "https://cloud.langfuse.com"
+
+    # Handle SecretStr type
+    if isinstance(public_key, SecretStr):
+        public_key = public_key.get_secret_value()
+    if isinstance(secret_key, SecretStr):
+        secret_key = secret_key.get_secret_value()
+
+    # Check if credentials are available
+    if not public_key or not secret_key:
+        return None, None, host
+    return public_key, secret_key, host
+
+
+# Credentials don't change for the lifetime of the process, so resolve them once
+_PUBLIC_KEY, _SECRET_KEY, _HOST = _resolve()
+
+# Set when telemetry is not configured, or after the first failure to create a handler,
+# so the steady-state path is a single flag check
+_DISABLED = _PUBLIC_KEY is None
+
+
+def is_langfuse_configured() -> bool:
+    """Whether Langfuse credentials were found in the environment or settings."""
+    return _PUBLIC_KEY is not None
+
+
+@functools.cache
+def get_langfuse_client() -> Langfuse | None:
+    """
+    Returns the process-wide Langfuse client, or None if credentials are not configured
+    or the client could not be created.
+
+    The client (and its HTTP connection pool and background flush thread) is created on
+    first use and shared by every request, instead of being rebuilt for each callback.
+    A failure to create it is cached as well, so it isn't retried on every request.
+    """
+    global _DISABLED
+    if _PUBLIC_KEY is None:
+        return None
+
+    try:
+        client = Langfuse(public_key=_PUBLIC_KEY, secret_key=_SECRET_KEY, host=_HOST)
+    except Exception as e:
+        _DISABLED = True
+        logger.error(f"Error creating the Langfuse client, disabling telemetry: {e}")
+        return None
+    # Make sure buffered events are sent before the process exits
+    atexit.register(client.flush)
+    return client
+
+
+def get_langfuse_callback(
+    user_id: str | None = None,
+    session_id: str | None = None,
+    trace_id: str | None = None,
+) -> CallbackHandler | None:
     """
     Creates and returns a Langfuse callback handler if credentials are configured.
     Returns None if credentials are not found.
-    
+
+    The handler is a lightweight per-trace view on the shared Langfuse client, so no new
+    HTTP client or background thread is started per call.
+
     Args:
         user_id: Optional user ID to associate with traces
         session_id: Optional session ID to associate with traces (typically the thread_id)
+        trace_id: Optional ID for the trace (typically the run_id, used to record feedback)
     """
-    # In deployment mode, we still want to enable telemetry if credentials are available
-    # Get Langfuse credentials from environment variables or settings
-    public_key = os.environ.get("LANGFUSE_PUBLIC_KEY") or getattr(settings, "LANGFUSE_PUBLIC_KEY", None)
-    secret_key = os.environ.get("LANGFUSE_SECRET_KEY") or getattr(settings, "LANGFUSE_SECRET_KEY", None)
-    host = os.environ.get("LANGFUSE_HOST") or getattr(settings, "LANGFUSE_HOST", None) or "https://cloud.langfuse.com"
-    
-    # Check if credentials are available
-    if not public_key or not secret_key:
+    global _DISABLED
+    if _DISABLED:
         return None
-    
-    # Handle SecretStr type
-    if isinstance(public_key, SecretStr):
-        public_key = public_key.get_secret_value()
-    if isinstance(secret_key, SecretStr):
-        secret_key = secret_key.get_secret_value()
-    
+
+    client = get_langfuse_client()
+    if client is None:
+        # The client could not be created, which also disabled telemetry
+        return None
+
     # Create the handler with necessary parameters
     try:
-        handler_args = {
-            "public_key": public_key,
-            "secret_key": secret_key,
-            "host": host
-        }
-        
-        # Add user_id if provided
-        if user_id:
-            handler_args["user_id"] = user_id
-        
-        # Add session_id if provided
-        if session_id:
-            handler_args["session_id"] = session_id
-        
-        return CallbackHandler(**handler_args)
+        trace = client.trace(id=trace_id, user_id=user_id, session_id=session_id)
+        return CallbackHandler(
+            stateful_client=trace,
+            update_stateful_client=True,
+            user_id=user_id,
+            session_id=session_id,
+        )
     except Exception as e:
-        logger.error(f"Error creating Langfuse callback handler: {e}")
-        return None
\ No newline at end of file
+        # Fail fast: don't retry (and log) on every request with a broken configuration
+        _DISABLED = True
+        logger.error(f"Error creating Langfuse callback handler, disabling telemetry: {e}")
+        return None
@@ -13,7 +13,7 @@ def initialize_database() -> AbstractAsyncContextManager[AsyncSqliteSaver | Asyn
     Initialize the appropriate database checkpointer based on configuration.
     Returns an initialized AsyncCheckpointer instance.
     """
-    if settings.DATABASE_TYPE == DatabaseType.POSTGRES:
+    if settings.DATABASE_TYPE is DatabaseType.POSTGRES:
         return get_postgres_saver()
     else:  # Default to SQLite
         return get_sqlite_saver()
@@ -1,12 +1,28 @@
 import logging
-from contextlib import AbstractAsyncContextManager
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from core.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Connections shared by all worker processes when POSTGRES_POOL_MAX is not set. Every
+# worker has its own pool, so this is split between them to stay below the server's
+# connection limit.
+DEFAULT_TOTAL_POOL_SIZE = 20
+
+
+def get_pool_sizes() -> tuple[int, int]:
+    """Return the (min_size, max_size) of this process's connection pool."""
+    max_size = settings.POSTGRES_POOL_MAX or max(
+        DEFAULT_TOTAL_POOL_SIZE // max(settings.WORKERS, 1), 1
+    )
+    return min(settings.POSTGRES_POOL_MIN, max_size), max_size
+
 
 def validate_postgres_config() -> None:
     """
@@ -41,7 +57,26 @@ def get_postgres_connection_string() -> str:
     )
 
 
+@asynccontextmanager
+async def _postgres_saver() -> AsyncIterator[AsyncPostgresSaver]:
+    # A single connection would serialize every checkpoint read/write behind the saver's
+    # lock; a pool lets concurrent requests use separate connections. The pool lives for
+    # the whole app lifespan and is shared by every agent's checkpointer.
+    min_size, max_size = get_pool_sizes()
+    logger.info(f"PostgreSQL connection pool size: min={min_size}, max={max_size}")
+    async with AsyncConnectionPool(
+        get_postgres_connection_string(),
+        min_size=min_size,
+        max_size=max_size,
+        timeout=30,
+        # Connection settings required by AsyncPostgresSaver
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    ) as pool:
+        yield AsyncPostgresSaver(conn=pool)
+
+
 def get_postgres_saver() -> AbstractAsyncContextManager[AsyncPostgresSaver]:
-    """Initialize and return a PostgreSQL saver instance."""
+    """Initialize and return a PostgreSQL saver instance backed by a connection pool."""
     validate_postgres_config()
-    return AsyncPostgresSaver.from_conn_string(get_postgres_connection_string())
+    return _postgres_saver()
@@ -6,6 +6,7 @@ import uvicorn
 from dotenv import load_dotenv
 
 from core import settings
+from core.settings import DatabaseType
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +23,41 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def run_gunicorn(workers: int) -> None:
+    """
+    Serve the app with gunicorn and uvicorn workers.
+
+    The app is preloaded in the master process before forking, so the agent graphs are
+    imported and compiled once and shared copy-on-write by all workers. Per-process
+    resources (database connections, the Langfuse client) are created lazily inside
+    each worker.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    from core.telemetry import get_langfuse_client
+
+    def post_fork(server, worker) -> None:
+        # Never reuse a Langfuse client (and its flush thread) from the master process
+        get_langfuse_client.cache_clear()
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            self.cfg.set("bind", f"{settings.HOST}:{settings.PORT}")
+            self.cfg.set("workers", workers)
+            # UvicornWorker picks uvloop and httptools when they are installed. It's the
+            # uvicorn-worker package, uvicorn.workers is deprecated.
+            self.cfg.set("worker_class", "uvicorn_worker.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            from service import app
+
+            return app
+
+    Application().run()
+
 if __name__ == "__main__":
     # Log deployment mode status
     if settings.MODE == "deployment":
@@ -44,6 +80,25 @@ if __name__ == "__main__":
     # This needs to be set before running the application server.
     # Refer to the documentation for more information.
     # https://www.psycopg.org/psycopg3/docs/advanced/async.html#asynchronous-operations
+    # Only the PostgreSQL checkpointer uses psycopg, so with SQLite the default loop is kept.
     if sys.platform == "win32":
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    uvicorn.run("service:app", host=settings.HOST, port=settings.PORT, reload=settings.is_dev())
+        if settings.DATABASE_TYPE is DatabaseType.POSTGRES:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        server_kwargs = {}
+    else:
+        # uvloop (libuv based event loop) and httptools (C HTTP parser) are considerably
+        # faster than the stock asyncio loop and h11 parser. Every streamed token goes
+        # through the event loop, so this directly benefits the /stream endpoints.
+        server_kwargs = {"loop": "uvloop", "http": "httptools"}
+    logger.info(f"Starting server with event loop settings: {server_kwargs or 'default'}")
+    if settings.WORKERS > 1 and not settings.is_dev() and sys.platform != "win32":
+        run_gunicorn(settings.WORKERS)
+    else:
+        uvicorn.run(
+            "service:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.is_dev(),
+            workers=None if settings.is_dev() else settings.WORKERS,
+            **server_kwargs,
+        )
@@ -0,0 +1,79 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from schema import ChatMessage, UserInput
+
+
+class InvokeCache:
+    """
+    In-process TTL cache of /invoke responses for stateless calls.
+
+    A call is stateless when it doesn't continue a thread and doesn't pass an agent_config,
+    so the same agent, model, user and message should give an equivalent answer. Entries
+    expire after `ttl` seconds and the least recently used entry is evicted once `maxsize`
+    entries are stored. Runs served from the cache have no trace of their own, so feedback
+    on them goes to the trace of the run that produced the entry. Negative feedback on a
+    run served from the cache drops its entry.
+
+    Args:
+        ttl: Time in seconds a cached response stays valid
+        maxsize: Maximum number of cached responses
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, ChatMessage]] = OrderedDict()
+        # The cache key and trace id each served run_id came from, for feedback
+        self._runs: OrderedDict[str, tuple[str, str]] = OrderedDict()
+
+    @staticmethod
+    def key_for(agent_id: str, user_input: UserInput) -> str | None:
+        """Return the cache key for the call, or None if the call must not be cached."""
+        if user_input.thread_id or user_input.agent_config:
+            return None
+        raw = "|".join(
+            (agent_id, user_input.model or "", user_input.user_id or "", user_input.message)
+        )
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> ChatMessage | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, message = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return message
+
+    def put(self, key: str, message: ChatMessage) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, message)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def record_run(self, run_id: str, key: str, trace_id: str | None = None) -> None:
+        """
+        Remember which entry a run was answered from.
+
+        Args:
+            run_id: The run_id returned to the client
+            key: The cache key of the entry
+            trace_id: The trace of the run that produced the entry, defaults to run_id
+        """
+        self._runs[run_id] = (key, trace_id or run_id)
+        if len(self._runs) > self._maxsize:
+            self._runs.popitem(last=False)
+
+    def trace_id_for(self, run_id: str) -> str:
+        """Return the trace to record feedback for a run on."""
+        run = self._runs.get(run_id)
+        return run[1] if run else run_id
+
+    def invalidate_run(self, run_id: str) -> None:
+        """Drop the entry a run was answered from, if it's still cached."""
+        if run := self._runs.get(run_id):
+            self._entries.pop(run[0], None)
@@ -1,24 +1,38 @@
+import dataclasses
+import enum
+import hmac
 import inspect
-import json
 import logging
 import warnings
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from typing import Annotated, Any
-from uuid import UUID, uuid4
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from fastapi.responses import StreamingResponse
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware  # Add CORS middleware
 from langchain_core._api import LangChainBetaWarning
-from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, ToolMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    AnyMessage,
+    FunctionMessage,
+    HumanMessage,
+    ToolMessage,
+)
 from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.constants import INTERRUPT
 from langgraph.pregel import Pregel
 from langgraph.types import Command, Interrupt
+from sse_starlette.sse import EventSourceResponse
 
-from agents import DEFAULT_AGENT, get_agent, get_all_agent_info
+from agents import DEFAULT_AGENT, get_agent, get_agent_or_none, get_all_agent_info
 from core import settings
+from core.telemetry import get_langfuse_callback, get_langfuse_client, is_langfuse_configured
 from memory import initialize_database
 from schema import (
     ChatHistory,
@@ -30,6 +44,7 @@ from schema import (
     StreamInput,
     UserInput,
 )
+from service.invoke_cache import InvokeCache
 from service.utils import (
     convert_message_content_to_string,
     langchain_to_chat_message,
@@ -39,6 +54,22 @@ from service.utils import (
 warnings.filterwarnings("ignore", category=LangChainBetaWarning)
 logger = logging.getLogger(__name__)
 
+# SSE frames are built as bytes, so the response doesn't re-encode every streamed chunk
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_DONE = b"data: [DONE]\n\n"
+_SSE_MESSAGE_PREFIX = _SSE_PREFIX + b'{"type":"message","content":'
+_SSE_MESSAGE_SUFFIX = b"}" + _SSE_SUFFIX
+# Seconds between keep-alive comments, so proxies don't close a stream while the agent thinks
+_SSE_PING_INTERVAL = 15
+
+# Computed once, inspect.signature is too slow to call for every streamed message
+_AI_MESSAGE_FIELDS = frozenset(inspect.signature(AIMessage).parameters)
+
+
+# The missing AUTH_SECRET warning is only logged for the first request, not for every one
+_auth_warning_logged = False
+
 
 def verify_bearer(
     http_auth: Annotated[
@@ -52,12 +83,18 @@ def verify_bearer(
     If AUTH_SECRET is not set, authentication is bypassed (development mode only).
     In production, AUTH_SECRET should always be set.
     """
+    global _auth_warning_logged
     if not settings.AUTH_SECRET:
-        logger.warning("AUTH_SECRET is not set - API endpoints are unprotected!")
+        if not _auth_warning_logged:
+            logger.warning("AUTH_SECRET is not set - API endpoints are unprotected!")
+            _auth_warning_logged = True
         return
-        
+
     auth_secret = settings.AUTH_SECRET.get_secret_value()
-    if not http_auth or http_auth.credentials != auth_secret:
+    # Constant-time comparison, so the response time doesn't leak how much of the key matched
+    if not http_auth or not hmac.compare_digest(
+        http_auth.credentials.encode(), auth_secret.encode()
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API key",
@@ -83,13 +120,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         raise
 
 
-app = FastAPI(lifespan=lifespan)
+# orjson serializes the JSON responses in C, which is considerably faster than json.dumps
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware to allow cross-origin requests
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for development (adjust for production)
-    allow_credentials=True,
+    allow_origins=settings.CORS_ORIGINS,
+    # Credentials can't be combined with a wildcard origin, so they're only allowed for
+    # an explicit list of origins
+    allow_credentials="*" not in settings.CORS_ORIGINS,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
 )
@@ -97,20 +137,48 @@ app.add_middleware(
 router = APIRouter(dependencies=[Depends(verify_bearer)])
 
 
-@router.get("/info")
-async def info() -> ServiceMetadata:
-    return ServiceMetadata(
-        agents=get_all_agent_info(),
-        default_agent=DEFAULT_AGENT,
-    )
+# The agent registry is fixed at import, so the /info body is serialized once
+_INFO_BYTES = orjson.dumps(
+    ServiceMetadata(agents=get_all_agent_info(), default_agent=DEFAULT_AGENT).model_dump()
+)
+
+
+@router.get("/info", response_model=ServiceMetadata)
+async def info() -> Response:
+    return Response(content=_INFO_BYTES, media_type="application/json")
+
+
+# Opt-in cache of stateless /invoke responses, see INVOKE_CACHE_TTL
+_invoke_cache = (
+    InvokeCache(ttl=settings.INVOKE_CACHE_TTL, maxsize=settings.INVOKE_CACHE_MAX_SIZE)
+    if settings.INVOKE_CACHE_TTL > 0
+    else None
+)
+
+
+def _get_agent_or_404(agent_id: str) -> Pregel:
+    """Look up an agent by id, raising a 404 if it doesn't exist."""
+    agent = get_agent_or_none(agent_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail=f"Agent not found: {agent_id}")
+    return agent
 
 
-async def _handle_input(user_input: UserInput, agent: Pregel) -> tuple[dict[str, Any], UUID]:
+# Keys the service sets in the configurable, which agent_config can't override. They're
+# reserved whether or not the request sets them.
+_RESERVED_CONFIG_KEYS = frozenset({"thread_id", "model", "user_id"})
+
+
+async def _handle_input(user_input: UserInput, agent: Pregel) -> tuple[dict[str, Any], str]:
     """
     Parse user input and handle any required interrupt resumption.
     Returns kwargs for agent invocation and the run_id.
+
+    The run_id is returned as a string, which is how the responses use it. The config
+    keeps the UUID, since LangChain requires one for the root run.
     """
     run_id = uuid4()
+    run_id_str = str(run_id)
     thread_id = user_input.thread_id or str(uuid4())
     user_id = user_input.user_id
 
@@ -129,37 +197,34 @@ async def _handle_input(user_input: UserInput, agent: Pregel) -> tuple[dict[str,
 
     # Add agent_config
     if user_input.agent_config:
-        if overlap := configurable.keys() & user_input.agent_config.keys():
+        reserved = next((k for k in user_input.agent_config if k in _RESERVED_CONFIG_KEYS), None)
+        if reserved is not None:
             raise HTTPException(
                 status_code=422,
-                detail=f"agent_config contains reserved keys: {overlap}",
+                detail=f"agent_config contains reserved key: {reserved}",
             )
         configurable.update(user_input.agent_config)
 
-    # Get Langfuse callback handler
-    from core.telemetry import get_langfuse_callback
-    langfuse_handler = get_langfuse_callback(user_id=user_id, session_id=thread_id)
+    # Let the agent pass prompt caching hints to the model, unless agent_config opted out
+    configurable.setdefault("enable_prompt_cache", True)
+
+    # Get Langfuse callback handler (None when telemetry is not configured)
+    langfuse_handler = get_langfuse_callback(
+        user_id=user_id, session_id=thread_id, trace_id=run_id_str
+    )
     
-    # Build RunnableConfig
-    config_kwargs = {
+    # Build RunnableConfig (a TypedDict, so the dict is built directly)
+    config: RunnableConfig = {
         "configurable": configurable,
         "run_id": run_id,
     }
-    
+
     # Add callbacks if available
     if langfuse_handler:
-        config_kwargs["callbacks"] = [langfuse_handler]
-        
-    config = RunnableConfig(**config_kwargs)
-
-    # Check for interrupts that need to be resumed
-    state = await agent.aget_state(config=config)
-    interrupted_tasks = [
-        task for task in state.tasks if hasattr(task, "interrupts") and task.interrupts
-    ]
+        config["callbacks"] = [langfuse_handler]
 
     # Prepare input
-    if interrupted_tasks:
+    if await _is_interrupted(agent, config):
         # assume user input is response to resume agent execution from interrupt
         input = Command(resume=user_input.message)
     else:
@@ -170,7 +235,24 @@ async def _handle_input(user_input: UserInput, agent: Pregel) -> tuple[dict[str,
         "config": config,
     }
 
-    return kwargs, run_id
+    return kwargs, run_id_str
+
+
+async def _is_interrupted(agent: Pregel, config: RunnableConfig) -> bool:
+    """
+    Check whether the thread's last run was interrupted and is waiting to be resumed.
+
+    Reads the latest checkpoint directly instead of using aget_state, which also rebuilds
+    the channels and next tasks of the graph just to report the same interrupt writes.
+    """
+    if not isinstance(agent.checkpointer, BaseCheckpointSaver):
+        # Without a checkpointer there's no thread state to resume
+        return False
+    saved = await agent.checkpointer.aget_tuple(config)
+    if saved is None or not saved.pending_writes:
+        # First turn of the thread, or nothing pending after the last checkpoint
+        return False
+    return any(channel == INTERRUPT and value for _, channel, value in saved.pending_writes)
 
 
 @router.post("/{agent_id}/invoke")
@@ -188,7 +270,15 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
     # in interrupt-agent, or a tool step in research-assistant), it's omitted. Arguably,
     # you'd want to include it. You could update the API to return a list of ChatMessages
     # in that case.
-    agent: Pregel = get_agent(agent_id)
+    agent = _get_agent_or_404(agent_id)
+    cache_key = _invoke_cache.key_for(agent_id, user_input) if _invoke_cache else None
+    if cache_key and (cached := _invoke_cache.get(cache_key)):
+        # Served without running the agent, but with its own run_id. Feedback on it is
+        # recorded on the trace of the run that produced the cached response.
+        run_id = str(uuid4())
+        _invoke_cache.record_run(run_id, cache_key, trace_id=cached.run_id)
+        return cached.model_copy(update={"run_id": run_id})
+
     kwargs, run_id = await _handle_input(user_input, agent)
     try:
         response_events: list[tuple[str, Any]] = await agent.ainvoke(**kwargs, stream_mode=["updates", "values"])  # type: ignore # fmt: skip
@@ -205,7 +295,11 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
         else:
             raise ValueError(f"Unexpected response type: {response_type}")
 
-        output.run_id = str(run_id)
+        output.run_id = run_id
+        # Interrupts wait for the user's reply, so only completed responses are cached
+        if cache_key and response_type == "values":
+            _invoke_cache.put(cache_key, output)
+            _invoke_cache.record_run(run_id, cache_key)
         return output
     except Exception as e:
         logger.error(f"An exception occurred: {e}")
@@ -213,29 +307,33 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
 
 
 async def message_generator(
-    user_input: StreamInput, agent_id: str = DEFAULT_AGENT
-) -> AsyncGenerator[str, None]:
+    user_input: StreamInput, agent: Pregel, request: Request
+) -> AsyncGenerator[bytes, None]:
     """
     Generate a stream of messages from the agent.
 
     This is the workhorse method for the /stream endpoint.
     """
-    agent: Pregel = get_agent(agent_id)
     kwargs, run_id = await _handle_input(user_input, agent)
+    stream_node_updates = user_input.stream_node_updates is not False  # Default to True if not specified
 
+    events = agent.astream(**kwargs, stream_mode=["updates", "messages", "custom"])
     try:
         # Process streamed events from the graph and yield messages over the SSE stream.
-        async for stream_event in agent.astream(
-            **kwargs, stream_mode=["updates", "messages", "custom"]
-        ):
+        async for stream_event in events:
+            if await request.is_disconnected():
+                # Nobody is listening anymore, stop the agent instead of running it to the end
+                logger.info(f"Client disconnected, stopping run {run_id}")
+                return
             if not isinstance(stream_event, tuple):
                 continue
             stream_mode, event = stream_event
             new_messages = []
             if stream_mode == "updates":
-                # Send node updates to the client
-                if user_input.stream_node_updates is not False:  # Default to True if not specified
-                    for node, updates in event.items():
+                # A single pass over the event sends the node updates and collects messages
+                for node, updates in event.items():
+                    # Send node updates to the client
+                    if stream_node_updates:
                         # Include the actual update values in a safe way
                         try:
                             # If updates is too large or complex, we'll include a simplified version
@@ -243,9 +341,9 @@ async def message_generator(
                                 "node": node,
                                 "has_updates": updates is not None and len(updates) > 0,
                                 "updates": _simplify_node_updates(updates),
-                                "run_id": str(run_id)  # Include the run_id in node updates
+                                "run_id": run_id  # Include the run_id in node updates
                             }
-                            yield f"data: {json.dumps({'type': 'node_update', 'content': update_info})}\n\n"
+                            yield _frame("node_update", update_info, option=orjson.OPT_NON_STR_KEYS)
                         except Exception as e:
                             logger.warning(f"Error while serializing node update: {e}")
                             # Fallback to basic info if serialization fails
@@ -253,11 +351,10 @@ async def message_generator(
                                 "node": node,
                                 "has_updates": updates is not None and len(updates) > 0,
                                 "error": "Could not serialize node updates",
-                                "run_id": str(run_id)  # Include the run_id in fallback info too
+                                "run_id": run_id  # Include the run_id in fallback info too
                             }
-                            yield f"data: {json.dumps({'type': 'node_update', 'content': update_info})}\n\n"
-                
-                for node, updates in event.items():
+                            yield _frame("node_update", update_info)
+
                     # A simple approach to handle agent interrupts.
                     # In a more sophisticated implementation, we could add
                     # some structured ChatMessage type to return the interrupt value.
@@ -313,15 +410,20 @@ async def message_generator(
             for message in processed_messages:
                 try:
                     chat_message = langchain_to_chat_message(message)
-                    chat_message.run_id = str(run_id)
+                    chat_message.run_id = run_id
                 except Exception as e:
                     logger.error(f"Error parsing message: {e}")
-                    yield f"data: {json.dumps({'type': 'error', 'content': 'Unexpected error'})}\n\n"
+                    yield _frame("error", "Unexpected error")
                     continue
                 # LangGraph re-sends the input message, which feels weird, so drop it
                 if chat_message.type == "human" and chat_message.content == user_input.message:
                     continue
-                yield f"data: {json.dumps({'type': 'message', 'content': chat_message.model_dump()})}\n\n"
+                # The serializer writes the JSON directly, without an intermediate dict
+                yield (
+                    _SSE_MESSAGE_PREFIX
+                    + ChatMessage.__pydantic_serializer__.to_json(chat_message)
+                    + _SSE_MESSAGE_SUFFIX
+                )
 
             if stream_mode == "messages":
                 if not user_input.stream_tokens:
@@ -338,18 +440,27 @@ async def message_generator(
                     # Empty content in the context of OpenAI usually means
                     # that the model is asking for a tool to be invoked.
                     # So we only print non-empty content.
-                    yield f"data: {json.dumps({'type': 'token', 'content': convert_message_content_to_string(content)})}\n\n"
+                    yield _frame("token", convert_message_content_to_string(content))
     except Exception as e:
         logger.error(f"Error in message generator: {e}")
-        yield f"data: {json.dumps({'type': 'error', 'content': 'Internal server error'})}\n\n"
+        yield _frame("error", "Internal server error")
     finally:
-        yield "data: [DONE]\n\n"
+        # Closing the stream cancels the agent run if it's still going (e.g. on disconnect)
+        await events.aclose()
+    # Not sent from the finally block: yielding there would swallow a cancellation
+    yield _SSE_DONE
+
+
+def _frame(event_type: str, content: Any, option: int | None = None) -> bytes:
+    """Encode an event as an SSE data frame."""
+    frame = bytearray(_SSE_PREFIX)
+    frame += orjson.dumps({"type": event_type, "content": content}, option=option)
+    frame += _SSE_SUFFIX
+    return bytes(frame)
 
 
 def _create_ai_message(parts: dict) -> AIMessage:
-    sig = inspect.signature(AIMessage)
-    valid_keys = set(sig.parameters)
-    filtered = {k: v for k, v in parts.items() if k in valid_keys}
+    filtered = {k: v for k, v in parts.items() if k in _AI_MESSAGE_FIELDS}
     return AIMessage(**filtered)
 
 
@@ -381,39 +492,67 @@ def _simplify_node_updates(updates: Any) -> dict[str, Any]:
         # Add other keys from the updates dict
         for key, value in updates.items():
             if key != "messages":  # Skip messages as we've already processed them
-                try:
-                    # Try to serialize the value, if it fails, store a placeholder
-                    json.dumps(value)  # Test if serializable
+                if _is_serializable(value):
                     result[key] = value
-                except (TypeError, OverflowError):
+                else:
                     # If value isn't JSON serializable, store a simpler representation
                     result[key] = f"[Complex data: {type(value).__name__}]"
         
         return result
     
     # For non-dict objects, provide a basic representation
-    try:
-        # Try direct serialization first
-        json.dumps(updates)
+    if _is_serializable(updates):
         return {"value": updates}
-    except (TypeError, OverflowError):
-        # If that fails, return a simpler representation
-        return {"value": f"[Complex data: {type(updates).__name__}]"}
+    # If that fails, return a simpler representation
+    return {"value": f"[Complex data: {type(updates).__name__}]"}
+
+
+# JSON scalars are always serializable and don't need to be probed
+_JSON_SCALARS = frozenset({str, int, float, bool, type(None)})
+# Per-type results of the serializability probe, for types whose result doesn't depend
+# on the value (containers, dataclasses and enums are always probed)
+_serializable_types: dict[type, bool] = {}
+
+
+def _is_serializable(value: Any) -> bool:
+    """Check whether a value can be sent in a node update frame."""
+    value_type = type(value)
+    if value_type in _JSON_SCALARS:
+        return True
+    cached = _serializable_types.get(value_type)
+    if cached is not None:
+        return cached
+    try:
+        orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        serializable = True
+    except TypeError:  # orjson.JSONEncodeError is a TypeError
+        serializable = False
+    if not isinstance(value, (dict, list, tuple, enum.Enum)) and not dataclasses.is_dataclass(value):
+        _serializable_types[value_type] = serializable
+    return serializable
+
+
+_MSG_TYPE: dict[type, str] = {
+    HumanMessage: "human",
+    AIMessage: "ai",
+    ToolMessage: "tool",
+    FunctionMessage: "tool",
+}
+# Resolved type of every message class seen so far, including subclasses such as chunks
+_msg_type_cache: dict[type, str] = {}
 
 
 def _get_message_type(message: Any) -> str:
     """Get the type of a message object."""
-    if hasattr(message, "__class__"):
-        class_name = message.__class__.__name__
-        if "HumanMessage" in class_name:
-            return "human"
-        elif "AIMessage" in class_name:
-            return "ai"
-        elif "ToolMessage" in class_name or "FunctionMessage" in class_name:
-            return "tool"
-        else:
-            return class_name
-    return "unknown"
+    message_class = type(message)
+    message_type = _msg_type_cache.get(message_class)
+    if message_type is None:
+        message_type = next(
+            (name for cls, name in _MSG_TYPE.items() if isinstance(message, cls)),
+            message_class.__name__,
+        )
+        _msg_type_cache[message_class] = message_type
+    return message_type
 
 
 def _get_message_content(message: Any) -> str:
@@ -456,11 +595,13 @@ def _sse_response_example() -> dict[int | str, Any]:
 
 @router.post(
     "/{agent_id}/stream",
-    response_class=StreamingResponse,
+    response_class=EventSourceResponse,
     responses=_sse_response_example(),
 )
-@router.post("/stream", response_class=StreamingResponse, responses=_sse_response_example())
-async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> StreamingResponse:
+@router.post("/stream", response_class=EventSourceResponse, responses=_sse_response_example())
+async def stream(
+    user_input: StreamInput, request: Request, agent_id: str = DEFAULT_AGENT
+) -> EventSourceResponse:
     """
     Stream an agent's response to a user input, including intermediate messages and tokens.
 
@@ -470,77 +611,66 @@ async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> Stre
 
     Set `stream_tokens=false` to return intermediate messages but not token-by-token.
     """
-    return StreamingResponse(
-        message_generator(user_input, agent_id),
-        media_type="text/event-stream",
+    # Resolve the agent before the response starts, so an unknown agent_id is a 404
+    agent = _get_agent_or_404(agent_id)
+    # The frames are already encoded, EventSourceResponse adds keep-alive pings while the
+    # agent is busy and stops the generator when the client disconnects
+    return EventSourceResponse(
+        message_generator(user_input, agent, request),
+        ping=_SSE_PING_INTERVAL,
+        sep="\n",
     )
 
 
 @router.post("/feedback")
-async def feedback(feedback: Feedback) -> FeedbackResponse:
+async def feedback(feedback: Feedback, background_tasks: BackgroundTasks) -> FeedbackResponse:
     """
     Record feedback for a run using Langfuse.
 
     This is a simple wrapper for the Langfuse score API, so the
     credentials can be stored and managed in the service rather than the client.
+    The score is submitted after the response has been sent.
     """
-    try:
-        # Get Langfuse credentials from settings or environment variables
-        from langfuse import Langfuse
-        import os
-        from core import settings
-        from pydantic import SecretStr
-        
-        # Get credentials directly from environment or settings
-        public_key = os.environ.get("LANGFUSE_PUBLIC_KEY") or getattr(settings, "LANGFUSE_PUBLIC_KEY", None)
-        secret_key = os.environ.get("LANGFUSE_SECRET_KEY") or getattr(settings, "LANGFUSE_SECRET_KEY", None)
-        host = os.environ.get("LANGFUSE_HOST") or getattr(settings, "LANGFUSE_HOST", None) or "https://cloud.langfuse.com"
-        
-        # Check if credentials are available
-        if not public_key or not secret_key:
-            logger.error("Langfuse credentials not found, cannot record feedback")
-            raise HTTPException(status_code=500, detail="Langfuse credentials not found")
-        
-        # Handle SecretStr type
-        if isinstance(public_key, SecretStr):
-            public_key = public_key.get_secret_value()
-        if isinstance(secret_key, SecretStr):
-            secret_key = secret_key.get_secret_value()
-        
-        # Create Langfuse client with explicit credentials
-        langfuse = Langfuse(
-            public_key=public_key,
-            secret_key=secret_key,
-            host=host
-        )
-        
-        # Log for debugging
-        logger.info(f"Submitting feedback for run_id: {feedback.run_id}")
-        
-        # Convert feedback to Langfuse score
-        langfuse.score(
-            id=str(uuid4()),  # Generate a unique ID
-            trace_id=feedback.run_id,  # Use run_id as trace_id
-            name=feedback.key,  # Use the feedback key as the score name
-            value=feedback.score,  # Use the feedback score as the value
-            comment=feedback.kwargs.get("comment", "") if feedback.kwargs else "",
-        )
-        
-        return FeedbackResponse()
-    except Exception as e:
-        logger.error(f"Error recording feedback with Langfuse: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error recording feedback: {str(e)}")
+    trace_id = feedback.run_id
+    if _invoke_cache:
+        # Runs served from the cache are scored on the trace that produced the response
+        trace_id = _invoke_cache.trace_id_for(feedback.run_id)
+        if feedback.score <= 0:
+            # Don't keep serving a cached response that was rated negatively
+            _invoke_cache.invalidate_run(feedback.run_id)
+
+    # Shared with the tracing callbacks, so no client is created per request
+    if not is_langfuse_configured():
+        logger.error("Langfuse credentials not found, cannot record feedback")
+        raise HTTPException(status_code=500, detail="Langfuse credentials not found")
+    langfuse = get_langfuse_client()
+    if langfuse is None:
+        # Creating the client failed, the error was logged when it was attempted
+        raise HTTPException(status_code=500, detail="Error recording feedback")
+
+    logger.info(f"Submitting feedback for run_id: {feedback.run_id} (trace_id: {trace_id})")
+
+    # Convert feedback to Langfuse score
+    background_tasks.add_task(
+        langfuse.score,
+        id=str(uuid4()),  # Generate a unique ID
+        trace_id=trace_id,
+        name=feedback.key,  # Use the feedback key as the score name
+        value=feedback.score,  # Use the feedback score as the value
+        comment=feedback.kwargs.get("comment", "") if feedback.kwargs else "",
+    )
+    return FeedbackResponse()
 
 
 @router.post("/history")
-def history(input: ChatHistoryInput) -> ChatHistory:
+async def history(input: ChatHistoryInput) -> ChatHistory:
     """
     Get chat history.
     """
     # TODO: Hard-coding DEFAULT_AGENT here is wonky
-    agent: Pregel = get_agent(DEFAULT_AGENT)
+    agent = _get_agent_or_404(DEFAULT_AGENT)
     try:
-        state_snapshot = agent.get_state(
+        state_snapshot = await agent.aget_state(
             config=RunnableConfig(
                 configurable={
                     "thread_id": input.thread_id,
@@ -555,10 +685,13 @@ def history(input: ChatHistoryInput) -> ChatHistory:
         raise HTTPException(status_code=500, detail="Unexpected error")
 
 
+_HEALTH_BYTES = b'{"status":"ok"}'
+
+
 @app.get("/health")
-async def health_check():
+async def health_check() -> Response:
     """Health check endpoint."""
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 app.include_router(router)
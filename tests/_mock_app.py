@@ -0,0 +1,34 @@
+"""
+Minimal FastAPI app that mimics the production endpoints, for tests that must run
+without the real service and its agents.
+"""
+import functools
+
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
+
+
+class MessageRequest(BaseModel):
+    message: str
+    model: str = None
+
+
+@functools.lru_cache(maxsize=1)
+def make_mock_app() -> FastAPI:
+    """Build the mock app once, every caller shares the same instance."""
+    mock_app = FastAPI()
+
+    @mock_app.post("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    # Plain dicts are returned as is, without a response model to validate them against
+    @mock_app.post("/invoke", response_model=None)
+    async def invoke(request: MessageRequest) -> dict:
+        return {"type": "ai", "content": f"Mock response to: {request.message}"}
+
+    @mock_app.post("/feedback")
+    async def feedback(request: Request):
+        return {"status": "success"}
+
+    return mock_app
@@ -0,0 +1,10 @@
+"""Helpers shared by the test modules."""
+from typing import Any
+
+import httpx
+import orjson
+
+
+def json_body(response: httpx.Response) -> Any:
+    """Parse a JSON response straight from its raw bytes."""
+    return orjson.loads(response.content)
@@ -0,0 +1,39 @@
+import pytest
+
+from agents import DEFAULT_AGENT, get_agent, get_agent_or_none, get_all_agent_info
+from agents.agents import agents
+from agents.research_assistant import _get_llm, _prompt_cache_kwargs
+
+
+def test_get_all_agent_info_is_prebuilt():
+    """Agent info is built once at import and shared between calls."""
+    info = get_all_agent_info()
+    assert info is get_all_agent_info()
+    assert [a.key for a in info] == list(agents)
+    assert DEFAULT_AGENT in {a.key for a in info}
+
+
+def test_get_agent_returns_registered_graph():
+    assert get_agent(DEFAULT_AGENT) is agents[DEFAULT_AGENT].graph
+    assert get_agent_or_none(DEFAULT_AGENT) is agents[DEFAULT_AGENT].graph
+    assert get_agent_or_none("unknown-agent") is None
+    with pytest.raises(KeyError):
+        get_agent("unknown-agent")
+
+
+def test_prompt_cache_kwargs():
+    """OpenAI calls are keyed by thread when prompt caching is enabled."""
+    config = {"configurable": {"thread_id": "thread-1", "enable_prompt_cache": True}}
+    assert _prompt_cache_kwargs(config) == {"extra_body": {"prompt_cache_key": "thread-1"}}
+    assert _prompt_cache_kwargs({"configurable": {"thread_id": "thread-1"}}) == {}
+    assert _prompt_cache_kwargs({}) == {}
+
+
+def test_llm_is_not_forced_to_stream(monkeypatch):
+    """Non-streamed calls keep their token usage, /stream streams through LangGraph."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    _get_llm.cache_clear()
+    try:
+        assert not _get_llm().streaming
+    finally:
+        _get_llm.cache_clear()
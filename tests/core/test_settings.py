@@ -1,10 +1,6 @@
 """
 Tests for the simplified Settings module used in deployment mode.
 """
-import os
-from unittest.mock import patch
-
-import pytest
 from pydantic import SecretStr
 
 from core.settings import Settings
@@ -33,41 +29,34 @@ def test_settings_is_dev():
     assert settings.is_dev() is False
 
 
-def test_settings_with_langfuse():
+def test_settings_with_langfuse(mock_env, monkeypatch):
     """Test settings with Langfuse configuration."""
-    with patch.dict(
-        os.environ,
-        {
-            "LANGFUSE_PUBLIC_KEY": "pk-test",
-            "LANGFUSE_SECRET_KEY": "sk-test",
-            "LANGFUSE_HOST": "https://custom.langfuse.com",
-        },
-        clear=True,
-    ):
-        settings = Settings(_env_file=None)
-        assert settings.LANGFUSE_PUBLIC_KEY == SecretStr("pk-test")
-        assert settings.LANGFUSE_SECRET_KEY == SecretStr("sk-test")
-        assert settings.LANGFUSE_HOST == "https://custom.langfuse.com"
+    monkeypatch.setenv("LANGFUSE_PUBLIC_KEY", "pk-test")
+    monkeypatch.setenv("LANGFUSE_SECRET_KEY", "sk-test")
+    monkeypatch.setenv("LANGFUSE_HOST", "https://custom.langfuse.com")
+
+    settings = Settings(_env_file=None)
+    assert settings.LANGFUSE_PUBLIC_KEY == SecretStr("pk-test")
+    assert settings.LANGFUSE_SECRET_KEY == SecretStr("sk-test")
+    assert settings.LANGFUSE_HOST == "https://custom.langfuse.com"
 
 
-def test_settings_with_database_config():
+def test_settings_with_database_config(mock_env, monkeypatch):
     """Test settings with database configuration."""
-    with patch.dict(
-        os.environ,
-        {
-            "DATABASE_TYPE": "postgres",
-            "POSTGRES_USER": "testuser",
-            "POSTGRES_PASSWORD": "testpass",
-            "POSTGRES_HOST": "localhost",
-            "POSTGRES_PORT": "5432",
-            "POSTGRES_DB": "testdb",
-        },
-        clear=True,
-    ):
-        settings = Settings(_env_file=None)
-        assert settings.DATABASE_TYPE == "postgres"
-        assert settings.POSTGRES_USER == "testuser"
-        assert settings.POSTGRES_PASSWORD == SecretStr("testpass")
-        assert settings.POSTGRES_HOST == "localhost"
-        assert settings.POSTGRES_PORT == 5432
-        assert settings.POSTGRES_DB == "testdb"
+    for name, value in {
+        "DATABASE_TYPE": "postgres",
+        "POSTGRES_USER": "testuser",
+        "POSTGRES_PASSWORD": "testpass",
+        "POSTGRES_HOST": "localhost",
+        "POSTGRES_PORT": "5432",
+        "POSTGRES_DB": "testdb",
+    }.items():
+        monkeypatch.setenv(name, value)
+
+    settings = Settings(_env_file=None)
+    assert settings.DATABASE_TYPE == "postgres"
+    assert settings.POSTGRES_USER == "testuser"
+    assert settings.POSTGRES_PASSWORD == SecretStr("testpass")
+    assert settings.POSTGRES_HOST == "localhost"
+    assert settings.POSTGRES_PORT == 5432
+    assert settings.POSTGRES_DB == "testdb"
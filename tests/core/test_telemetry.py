@@ -0,0 +1,70 @@
+"""
+Tests for the shared Langfuse client and the per-request callback handlers.
+"""
+from unittest.mock import patch
+
+import pytest
+from langfuse import Langfuse
+
+from core import telemetry
+
+
+@pytest.fixture
+def langfuse_cls(monkeypatch):
+    """Configure telemetry with fake credentials and patch the Langfuse constructor."""
+    monkeypatch.setattr(telemetry, "_PUBLIC_KEY", "pk-test")
+    monkeypatch.setattr(telemetry, "_SECRET_KEY", "sk-test")
+    monkeypatch.setattr(telemetry, "_DISABLED", False)
+    telemetry.get_langfuse_client.cache_clear()
+    # A disabled client builds real traces without sending anything
+    client = Langfuse(public_key="pk-test", secret_key="sk-test", enabled=False)
+    with (
+        patch("core.telemetry.Langfuse", return_value=client) as langfuse_cls,
+        patch("core.telemetry.atexit.register"),
+    ):
+        yield langfuse_cls
+    telemetry.get_langfuse_client.cache_clear()
+
+
+def test_unconfigured(monkeypatch):
+    """Without credentials there is no client and no callback handler."""
+    monkeypatch.setattr(telemetry, "_PUBLIC_KEY", None)
+    monkeypatch.setattr(telemetry, "_DISABLED", True)
+    telemetry.get_langfuse_client.cache_clear()
+    with patch("core.telemetry.Langfuse") as langfuse_cls:
+        assert telemetry.get_langfuse_client() is None
+        assert telemetry.get_langfuse_callback(trace_id="run-1") is None
+    langfuse_cls.assert_not_called()
+    telemetry.get_langfuse_client.cache_clear()
+
+
+def test_client_is_shared(langfuse_cls):
+    """The client is created once and shared by every callback handler."""
+    client = telemetry.get_langfuse_client()
+    assert telemetry.get_langfuse_client() is client
+    telemetry.get_langfuse_callback(trace_id="run-1")
+    telemetry.get_langfuse_callback(trace_id="run-2")
+    langfuse_cls.assert_called_once_with(
+        public_key="pk-test", secret_key="sk-test", host=telemetry._HOST
+    )
+
+
+def test_callback_is_bound_to_run_trace(langfuse_cls):
+    """The handler records on a trace whose id is the run_id, which feedback scores."""
+    handler = telemetry.get_langfuse_callback(
+        user_id="user-1", session_id="thread-1", trace_id="run-1"
+    )
+    assert handler is not None
+    assert handler.trace.id == "run-1"
+
+
+def test_disabled_after_client_failure(langfuse_cls):
+    """A failure to create the client disables telemetry instead of retrying per request."""
+    langfuse_cls.side_effect = ValueError("bad credentials")
+    assert telemetry.get_langfuse_callback(trace_id="run-1") is None
+    assert telemetry._DISABLED is True
+
+    assert telemetry.get_langfuse_callback(trace_id="run-2") is None
+    # The failure is cached, so /feedback doesn't rebuild the client either
+    assert telemetry.get_langfuse_client() is None
+    langfuse_cls.assert_called_once()
@@ -0,0 +1,28 @@
+"""
+Tests for the PostgreSQL connection pool sizing.
+"""
+import pytest
+
+from memory.postgres import get_pool_sizes
+
+
+@pytest.mark.parametrize(
+    "workers, pool_min, pool_max, expected",
+    [
+        # The default total of 20 connections is split between the workers
+        (1, 2, None, (2, 20)),
+        (4, 2, None, (2, 5)),
+        (3, 2, None, (2, 6)),
+        # Every worker keeps at least one connection, and min never exceeds max
+        (40, 2, None, (1, 1)),
+        (0, 2, None, (2, 20)),
+        # An explicit per-worker maximum isn't split
+        (4, 2, 10, (2, 10)),
+        (4, 5, 3, (3, 3)),
+    ],
+)
+def test_get_pool_sizes(monkeypatch, workers, pool_min, pool_max, expected):
+    monkeypatch.setattr("memory.postgres.settings.WORKERS", workers)
+    monkeypatch.setattr("memory.postgres.settings.POSTGRES_POOL_MIN", pool_min)
+    monkeypatch.setattr("memory.postgres.settings.POSTGRES_POOL_MAX", pool_max)
+    assert get_pool_sizes() == expected
@@ -1,49 +1,83 @@
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 from langchain_core.messages import AIMessage
 
-# Mock the agents module before importing app
-with patch.dict('sys.modules', {
-    'agents': Mock(),
-    'agents.agents': Mock(),
-    'agents.research_assistant': Mock()
-}):
-    from service import app
+# The research assistant builds its LLM client lazily, so the real agents module can be
+# imported without any LLM credentials.
+from agents.agents import agents
+from service import app
+
+# Attributes of the agent mocks that the tests configure or replace
+_AGENT_MOCK_ATTRS = ("ainvoke", "astream", "aget_state", "get_state", "checkpointer")
+
+
+def _new_agent_mock() -> AsyncMock:
+    agent_mock = AsyncMock()
+    agent_mock.get_state = Mock()
+    # Keep the original children, so attributes replaced by a test can be restored
+    agent_mock._test_defaults = {name: getattr(agent_mock, name) for name in _AGENT_MOCK_ATTRS}
+    return agent_mock
+
+
+def _reset_agent_mock(agent_mock: AsyncMock) -> AsyncMock:
+    """Bring a session-scoped agent mock back to its initial state for the next test."""
+    for name, child in agent_mock._test_defaults.items():
+        setattr(agent_mock, name, child)
+    agent_mock.reset_mock(return_value=True, side_effect=True)
+    agent_mock.ainvoke.return_value = [
+        ("values", {"messages": [AIMessage(content="Test response")]})
+    ]
+    return agent_mock
+
+
+@pytest.fixture(scope="session")
+def _default_agent_proto():
+    """One mock for the registry's agents, shared by the session and reset per test."""
+    return _new_agent_mock()
+
+
+@pytest.fixture(scope="session")
+def _mock_agent_proto():
+    """One mock for the agent under test, shared by the session and reset per test."""
+    return _new_agent_mock()
 
 
 @pytest.fixture(autouse=True)
-def mock_agents():
-    """Mock the agents module to prevent actual LLM initialization."""
-    with patch('agents.agents.DEFAULT_AGENT', 'default_agent'):
-        with patch('agents.agents.get_agent') as mock_get_agent:
-            agent_mock = AsyncMock()
-            agent_mock.ainvoke = AsyncMock(
-                return_value=[("values", {"messages": [AIMessage(content="Test response")]})]
-            )
-            agent_mock.get_state = Mock()
-            mock_get_agent.return_value = agent_mock
-            yield agent_mock
+def mock_agents(_default_agent_proto):
+    """
+    Stand in for every registered agent, so no test runs a real agent (and its LLM).
 
+    The service resolves agents through service.service.get_agent_or_none, so that's the
+    name patched here. Unknown agent ids still resolve to None.
+    """
+    agent_mock = _reset_agent_mock(_default_agent_proto)
 
-@pytest.fixture
-def test_client():
-    """Fixture to create a FastAPI test client."""
+    def lookup(agent_id: str) -> AsyncMock | None:
+        return agent_mock if agent_id in agents else None
+
+    with patch("service.service.get_agent_or_none", side_effect=lookup):
+        yield agent_mock
+
+
+@pytest_asyncio.fixture
+async def test_client():
+    """Fixture to create an async client that calls the FastAPI app in-process."""
     # Patch settings to force deployment mode during tests
     with patch("core.settings.settings.MODE", "deployment"):
-        return TestClient(app)
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
 
 
 @pytest.fixture
-def mock_agent():
-    """Fixture to create a mock agent that can be configured for different test scenarios."""
-    agent_mock = AsyncMock()
-    agent_mock.ainvoke = AsyncMock(
-        return_value=[("values", {"messages": [AIMessage(content="Test response")]})]
-    )
-    agent_mock.get_state = Mock()  # Default empty mock for get_state
-    with patch("service.service.get_agent", Mock(return_value=agent_mock)):
+def mock_agent(_mock_agent_proto):
+    """Fixture to provide a mock agent that can be configured for different test scenarios."""
+    agent_mock = _reset_agent_mock(_mock_agent_proto)
+    with patch("service.service.get_agent_or_none", Mock(return_value=agent_mock)):
         yield agent_mock
 
 
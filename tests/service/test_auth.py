@@ -1,10 +1,12 @@
+import pytest
 from pydantic import SecretStr
 
 
-def test_no_auth_secret(mock_settings, mock_agent, test_client):
+@pytest.mark.asyncio
+async def test_no_auth_secret(mock_settings, mock_agent, test_client):
     """Test that when AUTH_SECRET is not set, all requests are allowed"""
     mock_settings.AUTH_SECRET = None
-    response = test_client.post(
+    response = await test_client.post(
         "/invoke",
         json={"message": "test"},
         headers={"Authorization": "Bearer any-token"},
@@ -12,14 +14,15 @@ def test_no_auth_secret(mock_settings, mock_agent, test_client):
     assert response.status_code == 200
 
     # Should also work without any auth header
-    response = test_client.post("/invoke", json={"message": "test"})
+    response = await test_client.post("/invoke", json={"message": "test"})
     assert response.status_code == 200
 
 
-def test_auth_secret_correct(mock_settings, mock_agent, test_client):
+@pytest.mark.asyncio
+async def test_auth_secret_correct(mock_settings, mock_agent, test_client):
     """Test that when AUTH_SECRET is set, requests with correct token are allowed"""
     mock_settings.AUTH_SECRET = SecretStr("test-secret")
-    response = test_client.post(
+    response = await test_client.post(
         "/invoke",
         json={"message": "test"},
         headers={"Authorization": "Bearer test-secret"},
@@ -27,10 +30,11 @@ def test_auth_secret_correct(mock_settings, mock_agent, test_client):
     assert response.status_code == 200
 
 
-def test_auth_secret_incorrect(mock_settings, mock_agent, test_client):
+@pytest.mark.asyncio
+async def test_auth_secret_incorrect(mock_settings, mock_agent, test_client):
     """Test that when AUTH_SECRET is set, requests with wrong token are rejected"""
     mock_settings.AUTH_SECRET = SecretStr("test-secret")
-    response = test_client.post(
+    response = await test_client.post(
         "/invoke",
         json={"message": "test"},
         headers={"Authorization": "Bearer wrong-secret"},
@@ -38,5 +42,5 @@ def test_auth_secret_incorrect(mock_settings, mock_agent, test_client):
     assert response.status_code == 401
 
     # Should also reject requests with no auth header
-    response = test_client.post("/invoke", json={"message": "test"})
+    response = await test_client.post("/invoke", json={"message": "test"})
     assert response.status_code == 401
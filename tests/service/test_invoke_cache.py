@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import pytest
+
+from _util import json_body
+from schema import ChatMessage, UserInput
+from service.invoke_cache import InvokeCache
+
+
+def test_key_for_stateless_calls_only() -> None:
+    key = InvokeCache.key_for("agent", UserInput(message="Hello"))
+    assert key == InvokeCache.key_for("agent", UserInput(message="Hello"))
+    assert key != InvokeCache.key_for("agent", UserInput(message="Hello", model="gpt-4o"))
+    assert key != InvokeCache.key_for("other-agent", UserInput(message="Hello"))
+    assert InvokeCache.key_for("agent", UserInput(message="Hello", thread_id="t")) is None
+    assert InvokeCache.key_for("agent", UserInput(message="Hello", agent_config={"a": 1})) is None
+
+
+def test_entries_expire() -> None:
+    cache = InvokeCache(ttl=10)
+    message = ChatMessage(type="ai", content="Hi")
+    with patch("service.invoke_cache.time.monotonic", return_value=100.0):
+        cache.put("key", message)
+        assert cache.get("key") is message
+    with patch("service.invoke_cache.time.monotonic", return_value=110.0):
+        assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = InvokeCache(ttl=10, maxsize=2)
+    cache.put("a", ChatMessage(type="ai", content="a"))
+    cache.put("b", ChatMessage(type="ai", content="b"))
+    cache.get("a")
+    cache.put("c", ChatMessage(type="ai", content="c"))
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_invalidate_run() -> None:
+    cache = InvokeCache(ttl=10)
+    cache.put("key", ChatMessage(type="ai", content="Hi"))
+    cache.record_run("run-1", "key")
+    cache.invalidate_run("run-1")
+    assert cache.get("key") is None
+    # Unknown runs are ignored
+    cache.invalidate_run("run-2")
+
+
+def test_trace_id_for() -> None:
+    cache = InvokeCache(ttl=10)
+    cache.record_run("run-1", "key")
+    cache.record_run("run-2", "key", trace_id="run-1")
+    assert cache.trace_id_for("run-1") == "run-1"
+    assert cache.trace_id_for("run-2") == "run-1"
+    # Runs that weren't cached keep their own trace
+    assert cache.trace_id_for("run-3") == "run-3"
+
+
+@pytest.mark.asyncio
+async def test_invoke_uses_cache(test_client, mock_agent) -> None:
+    with patch("service.service._invoke_cache", InvokeCache(ttl=60)):
+        first = json_body(await test_client.post("/invoke", json={"message": "Hello"}))
+        second = json_body(await test_client.post("/invoke", json={"message": "Hello"}))
+
+    mock_agent.ainvoke.assert_awaited_once()
+    assert second["content"] == first["content"]
+    assert second["run_id"] != first["run_id"]
+
+
+@pytest.mark.asyncio
+@patch("service.service.is_langfuse_configured", return_value=True)
+@patch("service.service.get_langfuse_client")
+async def test_feedback_on_cached_run(mock_get_langfuse_client, _, test_client, mock_agent) -> None:
+    """Feedback on a cache hit is scored on the trace of the run that produced the answer."""
+    langfuse = mock_get_langfuse_client.return_value
+    with patch("service.service._invoke_cache", InvokeCache(ttl=60)):
+        first = json_body(await test_client.post("/invoke", json={"message": "Hello"}))
+        second = json_body(await test_client.post("/invoke", json={"message": "Hello"}))
+        response = await test_client.post(
+            "/feedback", json={"run_id": second["run_id"], "key": "stars", "score": 1.0}
+        )
+
+    assert response.status_code == 200
+    langfuse.score.assert_called_once()
+    assert langfuse.score.call_args.kwargs["trace_id"] == first["run_id"]
@@ -1,189 +1,298 @@
-import json
+from functools import lru_cache
+from typing import TypedDict
 from unittest.mock import AsyncMock, Mock, patch
 
+import orjson
 import pytest
 from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
 from langgraph.pregel.types import StateSnapshot
-from langgraph.types import Interrupt
+from langgraph.types import Command, Interrupt, interrupt
+
+from _util import json_body
+from agents.agents import DEFAULT_AGENT, agents
+from schema import ChatHistory, ServiceMetadata
+from service.service import _is_interrupted, _simplify_node_updates
+
+
+# The tests only read the messages they hand to the mocks, so each one is built once
+@lru_cache(maxsize=128)
+def _ai(content: str) -> AIMessage:
+    return AIMessage(content=content)
+
+
+@lru_cache(maxsize=128)
+def _human(content: str) -> HumanMessage:
+    return HumanMessage(content=content)
+
+
+def _last_input_msg(agent: Mock):
+    """Return the first input message of the agent's last ainvoke call."""
+    return agent.ainvoke.await_args.kwargs["input"]["messages"][0]
+
+
+def _last_config(agent: Mock) -> dict:
+    """Return the configurable entries of the agent's last ainvoke call."""
+    return agent.ainvoke.await_args.kwargs["config"]["configurable"]
+
+
+INVOKE_QUESTION = "What is the weather in Tokyo?"
+INVOKE_ANSWER = "The weather in Tokyo is 70 degrees."
+INVOKE_INTERRUPT = "Confirm weather check"
+INVOKE_VALUES = ("values", {"messages": [_ai(INVOKE_ANSWER)]})
+
+# (request fields, agent response events, expected content, expected configurable entries)
+INVOKE_CASES = [
+    pytest.param({}, [INVOKE_VALUES], INVOKE_ANSWER, {}, id="basic"),
+    pytest.param(
+        {"model": "gpt-4-turbo"}, [INVOKE_VALUES], INVOKE_ANSWER, {"model": "gpt-4-turbo"},
+        id="model",
+    ),
+    # Any model string is accepted, validation is handled by the agents themselves
+    pytest.param(
+        {"model": "any-model-name"}, [INVOKE_VALUES], INVOKE_ANSWER,
+        {"model": "any-model-name"}, id="any-model",
+    ),
+    pytest.param(
+        {"agent_config": {"spicy_level": 0.1, "additional_param": "value_foo"}},
+        [INVOKE_VALUES],
+        INVOKE_ANSWER,
+        {"spicy_level": 0.1, "additional_param": "value_foo"},
+        id="agent-config",
+    ),
+    pytest.param(
+        {},
+        [INVOKE_VALUES, ("updates", {"__interrupt__": [Interrupt(value=INVOKE_INTERRUPT)]})],
+        INVOKE_INTERRUPT,
+        {},
+        id="interrupt",
+    ),
+]
+
+STREAM_TOKENS = ("The", " weather", " in", " Tokyo", " is", " sunny", ".")
+STREAM_ANSWER = "".join(STREAM_TOKENS)
+STREAM_EVENTS = tuple(
+    ("messages", (AIMessageChunk(content=token), {"tags": []})) for token in STREAM_TOKENS
+) + (("updates", {"chat_model": {"messages": [_ai(STREAM_ANSWER)]}}),)
+
+FEEDBACK_BODY = {
+    "run_id": "847c6285-8fc9-4560-a83f-4e6285809254",
+    "key": "human-feedback-stars",
+    "score": 0.8,
+}
 
-from agents.agents import Agent
-from schema import ChatHistory, ChatMessage, ServiceMetadata
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "request_fields, response_events, expected_content, expected_configurable", INVOKE_CASES
+)
+async def test_invoke(
+    test_client, mock_agent, request_fields, response_events, expected_content,
+    expected_configurable,
+) -> None:
+    """Test that /invoke passes the input and config to the agent and returns its answer."""
+    mock_agent.ainvoke.return_value = response_events
+
+    response = await test_client.post(
+        "/invoke", json={"message": INVOKE_QUESTION, **request_fields}
+    )
+    assert response.status_code == 200
 
-def test_invoke(test_client, mock_agent) -> None:
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is 70 degrees."
-    mock_agent.ainvoke.return_value = [("values", {"messages": [AIMessage(content=ANSWER)]})]
+    mock_agent.ainvoke.assert_awaited_once()
+    input_message = _last_input_msg(mock_agent)
+    assert input_message.content == INVOKE_QUESTION
+    configurable = _last_config(mock_agent)
+    for key, value in expected_configurable.items():
+        assert configurable[key] == value
 
-    response = test_client.post("/invoke", json={"message": QUESTION})
+    output = json_body(response)
+    assert output["type"] == "ai"
+    assert output["content"] == expected_content
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"message": "Hello"},
+        {"message": "Hello", "model": "test-model"},
+        {"message": "Hello", "thread_id": "test-thread", "user_id": "test-user"},
+    ],
+)
+async def test_invoke_shapes(test_client, mock_agent, payload) -> None:
+    """Test that /invoke accepts the optional request fields and answers with an AI message."""
+    response = await test_client.post("/invoke", json=payload)
     assert response.status_code == 200
+    data = json_body(response)
+    assert data["type"] == "ai"
+    assert "content" in data
 
-    mock_agent.ainvoke.assert_awaited_once()
-    input_message = mock_agent.ainvoke.await_args.kwargs["input"]["messages"][0]
-    assert input_message.content == QUESTION
 
-    output = ChatMessage.model_validate(response.json())
-    assert output.type == "ai"
-    assert output.content == ANSWER
+@pytest.mark.asyncio
+async def test_invoke_reserved_agent_config(test_client, mock_agent) -> None:
+    """Test that a reserved key in agent_config is rejected."""
+    response = await test_client.post(
+        "/invoke", json={"message": INVOKE_QUESTION, "agent_config": {"model": "gpt-4o"}}
+    )
+    assert response.status_code == 422
+    mock_agent.ainvoke.assert_not_awaited()
 
 
-def test_invoke_custom_agent(test_client, mock_agent) -> None:
+@pytest.mark.asyncio
+async def test_invoke_custom_agent(test_client, mock_agent) -> None:
     """Test that /invoke works with a custom agent_id path parameter."""
     CUSTOM_AGENT = "custom_agent"
-    QUESTION = "What is the weather in Tokyo?"
     CUSTOM_ANSWER = "The weather in Tokyo is sunny."
     DEFAULT_ANSWER = "This is from the default agent."
 
-    # Create a separate mock for the default agent
+    # Stands in for the default agent
     default_mock = AsyncMock()
     default_mock.ainvoke.return_value = [
-        ("values", {"messages": [AIMessage(content=DEFAULT_ANSWER)]})
+        ("values", {"messages": [_ai(DEFAULT_ANSWER)]})
     ]
 
     # Configure our custom mock agent
-    mock_agent.ainvoke.return_value = [("values", {"messages": [AIMessage(content=CUSTOM_ANSWER)]})]
+    mock_agent.ainvoke.return_value = [("values", {"messages": [_ai(CUSTOM_ANSWER)]})]
 
-    # Patch get_agent to return the correct agent based on the provided agent_id
+    # Patch get_agent_or_none to return the correct agent based on the provided agent_id
     def agent_lookup(agent_id):
         if agent_id == CUSTOM_AGENT:
             return mock_agent
         return default_mock
 
-    with patch("service.service.get_agent", side_effect=agent_lookup):
-        response = test_client.post(f"/{CUSTOM_AGENT}/invoke", json={"message": QUESTION})
+    with patch("service.service.get_agent_or_none", side_effect=agent_lookup):
+        response = await test_client.post(
+            f"/{CUSTOM_AGENT}/invoke", json={"message": INVOKE_QUESTION}
+        )
         assert response.status_code == 200
 
         # Verify custom agent was called and default wasn't
         mock_agent.ainvoke.assert_awaited_once()
         default_mock.ainvoke.assert_not_awaited()
 
-        input_message = mock_agent.ainvoke.await_args.kwargs["input"]["messages"][0]
-        assert input_message.content == QUESTION
-
-        output = ChatMessage.model_validate(response.json())
-        assert output.type == "ai"
-        assert output.content == CUSTOM_ANSWER  # Verify we got the custom agent's response
+        input_message = _last_input_msg(mock_agent)
+        assert input_message.content == INVOKE_QUESTION
 
+        output = json_body(response)
+        assert output["type"] == "ai"
+        assert output["content"] == CUSTOM_ANSWER  # Verify we got the custom agent's response
 
-def test_invoke_model_param(test_client, mock_agent) -> None:
-    """Test that the model parameter is correctly passed to the agent."""
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is sunny."
-    CUSTOM_MODEL = "gpt-4-turbo"
-    mock_agent.ainvoke.return_value = [("values", {"messages": [AIMessage(content=ANSWER)]})]
-
-    response = test_client.post("/invoke", json={"message": QUESTION, "model": CUSTOM_MODEL})
-    assert response.status_code == 200
-
-    # Verify the model was passed correctly in the config
-    mock_agent.ainvoke.assert_awaited_once()
-    config = mock_agent.ainvoke.await_args.kwargs["config"]
-    assert config["configurable"]["model"] == CUSTOM_MODEL
-
-    # Verify the response is still correct
-    output = ChatMessage.model_validate(response.json())
-    assert output.type == "ai"
-    assert output.content == ANSWER
-
-    # With the simplified schema, any model string should be accepted
-    # since validation is handled by the agents themselves
-    ANY_MODEL = "any-model-name"
-    response = test_client.post("/invoke", json={"message": QUESTION, "model": ANY_MODEL})
-    assert response.status_code == 200
 
+@pytest.mark.asyncio
+async def test_invoke_unknown_agent(test_client) -> None:
+    """Test that /invoke and /stream return 404 for an agent_id that isn't registered."""
+    response = await test_client.post("/unknown-agent/invoke", json={"message": "Hello"})
+    assert response.status_code == 404
 
-def test_invoke_custom_agent_config(test_client, mock_agent) -> None:
-    """Test that the agent_config parameter is correctly passed to the agent."""
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is sunny."
-    CUSTOM_CONFIG = {"spicy_level": 0.1, "additional_param": "value_foo"}
+    response = await test_client.post("/unknown-agent/stream", json={"message": "Hello"})
+    assert response.status_code == 404
 
-    mock_agent.ainvoke.return_value = [("values", {"messages": [AIMessage(content=ANSWER)]})]
 
-    response = test_client.post(
-        "/invoke", json={"message": QUESTION, "agent_config": CUSTOM_CONFIG}
-    )
-    assert response.status_code == 200
+@pytest.mark.asyncio
+async def test_is_interrupted() -> None:
+    """Interrupts are detected from the saved checkpoint, like aget_state reports them."""
+
+    class State(TypedDict):
+        answer: str
+
+    def ask(state: State) -> State:
+        return {"answer": interrupt("Question?")}
+
+    builder = StateGraph(State)
+    builder.add_node("ask", ask)
+    builder.add_edge(START, "ask")
+    builder.add_edge("ask", END)
+    graph = builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "1"}}
+
+    assert not await _is_interrupted(graph, config)
+    await graph.ainvoke({"answer": ""}, config)
+    state = await graph.aget_state(config)
+    assert any(task.interrupts for task in state.tasks)
+    assert await _is_interrupted(graph, config)
+
+    await graph.ainvoke(Command(resume="42"), config)
+    assert not await _is_interrupted(graph, config)
+    assert not await _is_interrupted(builder.compile(), config)
+
+
+def test_simplify_node_updates() -> None:
+    """Serializable values are kept, anything else is replaced with a placeholder."""
+    updates = {
+        "messages": [_ai("Hello")],
+        "query": "weather",
+        "results": ["sunny", {"temp": 70}],
+        "raw": [_ai("nested")],
+        "message": _ai("complex"),
+    }
+    # Twice, so the cached per-type result is used as well
+    for _ in range(2):
+        assert _simplify_node_updates(updates) == {
+            "messages": [{"type": "ai", "content": "Hello"}],
+            "query": "weather",
+            "results": ["sunny", {"temp": 70}],
+            "raw": "[Complex data: list]",
+            "message": "[Complex data: AIMessage]",
+        }
 
-    # Verify the agent_config was passed correctly in the config
-    mock_agent.ainvoke.assert_awaited_once()
-    config = mock_agent.ainvoke.await_args.kwargs["config"]
-    assert config["configurable"]["spicy_level"] == 0.1
-    assert config["configurable"]["additional_param"] == "value_foo"
-
-    # Verify the response is still correct
-    output = ChatMessage.model_validate(response.json())
-    assert output.type == "ai"
-    assert output.content == ANSWER
-
-    # Verify a reserved key in agent_config throws a validation error
-    INVALID_CONFIG = {"model": "gpt-4o"}
-    response = test_client.post(
-        "/invoke", json={"message": QUESTION, "agent_config": INVALID_CONFIG}
-    )
-    assert response.status_code == 422
 
+@pytest.mark.asyncio
+@patch("service.service.is_langfuse_configured", return_value=True)
+@patch("service.service.get_langfuse_client")
+async def test_feedback(mock_get_langfuse_client: Mock, _: Mock, test_client) -> None:
+    """Test that feedback is properly recorded to Langfuse."""
+    langfuse_instance = mock_get_langfuse_client.return_value
+    langfuse_instance.score.return_value = None
 
-def test_invoke_interrupt(test_client, mock_agent) -> None:
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is 70 degrees."
-    INTERRUPT = "Confirm weather check"
-    mock_agent.ainvoke.return_value = [
-        ("values", {"messages": [AIMessage(content=ANSWER)]}),
-        ("updates", {"__interrupt__": [Interrupt(value=INTERRUPT)]}),
-    ]
+    response = await test_client.post("/feedback", json=FEEDBACK_BODY)
 
-    response = test_client.post("/invoke", json={"message": QUESTION})
     assert response.status_code == 200
+    assert json_body(response) == {"status": "success"}
+    
+    # Verify Langfuse score was called with the correct parameters
+    langfuse_instance.score.assert_called_once()
+    call_args = langfuse_instance.score.call_args[1]
+    assert call_args["trace_id"] == FEEDBACK_BODY["run_id"]
+    assert call_args["name"] == FEEDBACK_BODY["key"]
+    assert call_args["value"] == FEEDBACK_BODY["score"]
 
-    mock_agent.ainvoke.assert_awaited_once()
-    input_message = mock_agent.ainvoke.await_args.kwargs["input"]["messages"][0]
-    assert input_message.content == QUESTION
 
-    output = ChatMessage.model_validate(response.json())
-    assert output.type == "ai"
-    assert output.content == INTERRUPT
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "configured, detail",
+    [
+        pytest.param(False, "Langfuse credentials not found", id="unconfigured"),
+        pytest.param(True, "Error recording feedback", id="client-failed"),
+    ],
+)
+async def test_feedback_without_langfuse(test_client, configured, detail) -> None:
+    """Test that feedback fails when Langfuse is not configured or its client failed."""
+    with (
+        patch("service.service.is_langfuse_configured", return_value=configured),
+        patch("service.service.get_langfuse_client", return_value=None),
+    ):
+        response = await test_client.post("/feedback", json=FEEDBACK_BODY)
+    assert response.status_code == 500
+    assert json_body(response) == {"detail": detail}
 
 
-@patch("langfuse.Langfuse")
-def test_feedback(mock_langfuse: Mock, test_client) -> None:
-    """Test that feedback is properly recorded to Langfuse."""
-    # Create a mock instance that will be returned by Langfuse()
-    langfuse_instance = mock_langfuse.return_value
-    langfuse_instance.score.return_value = None
-    
-    # Mock environment variables and settings to simulate Langfuse credentials
-    with patch("os.environ.get", side_effect=lambda key, default=None: 
-              "fake-key" if key in ["LANGFUSE_PUBLIC_KEY", "LANGFUSE_SECRET_KEY"] else default):
-        with patch("core.settings.settings") as mock_settings:
-            # Configure settings for deployment mode with Langfuse enabled
-            mock_settings.MODE = "deployment"
-            mock_settings.LANGFUSE_HOST = "https://cloud.langfuse.com"
-            
-            body = {
-                "run_id": "847c6285-8fc9-4560-a83f-4e6285809254",
-                "key": "human-feedback-stars",
-                "score": 0.8,
-            }
-            response = test_client.post("/feedback", json=body)
-        
+@pytest.mark.asyncio
+async def test_info(test_client) -> None:
+    """Test that /info lists the registered agents and the default agent."""
+    response = await test_client.get("/info")
     assert response.status_code == 200
-    assert response.json() == {"status": "success"}
-    
-    # Verify Langfuse score was called with the correct parameters
-    langfuse_instance.score.assert_called_once()
-    call_args = langfuse_instance.score.call_args[1]
-    assert call_args["trace_id"] == "847c6285-8fc9-4560-a83f-4e6285809254"
-    assert call_args["name"] == "human-feedback-stars"
-    assert call_args["value"] == 0.8
 
+    output = ServiceMetadata.model_validate_json(response.content)
+    assert output.default_agent == DEFAULT_AGENT
+    assert [agent.key for agent in output.agents] == list(agents)
 
-def test_history(test_client, mock_agent) -> None:
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is 70 degrees."
-    user_question = HumanMessage(content=QUESTION)
-    agent_response = AIMessage(content=ANSWER)
-    mock_agent.get_state.return_value = StateSnapshot(
+
+@pytest.mark.asyncio
+async def test_history(test_client, mock_agent) -> None:
+    user_question = _human(INVOKE_QUESTION)
+    agent_response = _ai(INVOKE_ANSWER)
+    mock_agent.aget_state.return_value = StateSnapshot(
         values={"messages": [user_question, agent_response]},
         next=(),
         config={},
@@ -193,73 +302,52 @@ def test_history(test_client, mock_agent) -> None:
         tasks=(),
     )
 
-    response = test_client.post(
+    response = await test_client.post(
         "/history", json={"thread_id": "7bcc7cc1-99d7-4b1d-bdb5-e6f90ed44de6"}
     )
     assert response.status_code == 200
 
-    output = ChatHistory.model_validate(response.json())
+    # The one response validated against the schema, so ChatMessage regressions are caught
+    output = ChatHistory.model_validate_json(response.content)
     assert output.messages[0].type == "human"
-    assert output.messages[0].content == QUESTION
+    assert output.messages[0].content == INVOKE_QUESTION
     assert output.messages[1].type == "ai"
-    assert output.messages[1].content == ANSWER
+    assert output.messages[1].content == INVOKE_ANSWER
 
 
 @pytest.mark.asyncio
 async def test_stream(test_client, mock_agent) -> None:
     """Test streaming tokens and messages."""
-    QUESTION = "What is the weather in Tokyo?"
-    TOKENS = ["The", " weather", " in", " Tokyo", " is", " sunny", "."]
-    FINAL_ANSWER = "The weather in Tokyo is sunny."
-
-    # Configure mock to use our async iterator function
-    events = [
-        (
-            "messages",
-            (
-                AIMessageChunk(content=token),
-                {"tags": []},
-            ),
-        )
-        for token in TOKENS
-    ] + [
-        (
-            "updates",
-            {"chat_model": {"messages": [AIMessage(content=FINAL_ANSWER)]}},
-        )
-    ]
 
     async def mock_astream(**kwargs):
-        for event in events:
+        for event in STREAM_EVENTS:
             yield event
 
     mock_agent.astream = mock_astream
 
-    # Make request with streaming
-    with test_client.stream(
-        "POST", "/stream", json={"message": QUESTION, "stream_tokens": True}
-    ) as response:
-        assert response.status_code == 200
-        
-        # Read SSE events to verify token streaming
-        tokens = []
-        last_message = None
-        
-        for line in response.iter_lines():
-            if not line.strip():
-                continue
-            if line.startswith(b"data: "):
-                data = json.loads(line[6:])
-                if data.get("type") == "token":
-                    tokens.append(data["content"])
-                elif data.get("type") == "message":
-                    last_message = data["content"]
-                elif data == "[DONE]":
-                    break
-        
-        # Verify all tokens were received
-        assert "".join(tokens) == FINAL_ANSWER
-        
-        # Verify the final message was also received
-        assert last_message is not None
-        assert last_message["content"] == FINAL_ANSWER
+    # Read the whole stream at once and split it into SSE events
+    response = await test_client.post(
+        "/stream", json={"message": INVOKE_QUESTION, "stream_tokens": True}
+    )
+    assert response.status_code == 200
+
+    tokens = []
+    last_message = None
+    for event in response.content.split(b"\n\n"):
+        if not event.startswith(b"data: "):
+            continue
+        payload = event[6:]
+        if payload == b"[DONE]":
+            break
+        data = orjson.loads(payload)
+        if data["type"] == "token":
+            tokens.append(data["content"])
+        elif data["type"] == "message":
+            last_message = data["content"]
+
+    # Verify all tokens were received
+    assert "".join(tokens) == STREAM_ANSWER
+
+    # Verify the final message was also received
+    assert last_message is not None
+    assert last_message["content"] == STREAM_ANSWER
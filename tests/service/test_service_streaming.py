@@ -1,7 +1,10 @@
+from unittest.mock import AsyncMock, Mock
+
 import pytest
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, AIMessageChunk
 
-from service.service import _create_ai_message
+from schema import StreamInput
+from service.service import _create_ai_message, message_generator
 
 
 @pytest.mark.parametrize(
@@ -56,3 +59,31 @@ def test_create_ai_message_empty_dict_raises():
     """
     with pytest.raises(TypeError):
         _create_ai_message({})
+
+
+@pytest.mark.asyncio
+async def test_message_generator_stops_on_disconnect():
+    """The agent stream is closed as soon as the client has gone away."""
+    closed = False
+
+    async def astream(**kwargs):
+        nonlocal closed
+        try:
+            for token in ("Hello", " world", "!"):
+                yield ("messages", (AIMessageChunk(content=token), {}))
+        finally:
+            closed = True
+
+    agent = AsyncMock()
+    agent.checkpointer = None
+    agent.astream = astream
+    request = Mock()
+    request.is_disconnected = AsyncMock(side_effect=[False, True])
+
+    frames = [
+        frame
+        async for frame in message_generator(StreamInput(message="Hi"), agent, request)
+    ]
+
+    assert frames == [b'data: {"type":"token","content":"Hello"}\n\n']
+    assert closed
@@ -1,65 +0,0 @@
-"""
-Tests for the service in deployment mode without actual agent initialization.
-This test file is completely self-contained to avoid dependency conflicts.
-"""
-import json
-import sys
-from unittest.mock import AsyncMock, MagicMock, Mock, patch
-
-import pytest
-from fastapi import FastAPI
-from fastapi.testclient import TestClient
-from langchain_core.messages import AIMessage, HumanMessage
-
-# Explicitly disable the autouse fixture from conftest.py for this test file
-@pytest.fixture(scope="session", autouse=True)
-def _disable_autouse_fixtures():
-    """Disable autouse fixtures that cause dependency issues."""
-    pass
-
-# Create mocks for the imports that cause problems
-mock_state_snapshot = MagicMock()
-mock_interrupt = MagicMock()
-
-# Import necessary schemas with import mocks in place
-from schema import ChatHistory, ChatMessage
-
-# Create a minimal test app instead of importing the real one
-test_app = FastAPI()
-
-@test_app.post("/invoke")
-async def invoke(message: str, model: str = None):
-    """Mock implementation of invoke endpoint for testing"""
-    return ChatMessage(type="ai", content="Mock response for testing")
-    
-@test_app.post("/history")
-async def history(thread_id: str):
-    """Mock implementation of history endpoint for testing"""
-    return ChatHistory(messages=[
-        ChatMessage(type="human", content="Test message"),
-        ChatMessage(type="ai", content="Test response")
-    ])
-
-@pytest.fixture(scope="module")
-def test_client():
-    """Test client fixture with our mock app"""
-    return TestClient(test_app)
-
-def test_invoke(test_client):
-    """Test the invoke endpoint with basic inputs"""
-    response = test_client.post("/invoke", json={"message": "Hello", "model": "test-model"})
-    assert response.status_code == 200
-    data = response.json()
-    assert data["type"] == "ai"
-    assert "content" in data
-
-
-def test_history(test_client):
-    """Test the history endpoint"""
-    response = test_client.post("/history", json={"thread_id": "test-thread"})
-    assert response.status_code == 200
-    data = response.json()
-    assert "messages" in data
-    assert len(data["messages"]) == 2
-    assert data["messages"][0]["type"] == "human"
-    assert data["messages"][1]["type"] == "ai"
\ No newline at end of file
@@ -2,46 +2,22 @@
 Standalone tests for the deployment toolkit in isolation.
 This file runs completely independently of other test configurations.
 """
-import os
-import sys
 import pytest
-import tempfile
-from fastapi import FastAPI, Request
 from fastapi.testclient import TestClient
-from pydantic import BaseModel
 
-# Create a minimal test app that mimics our production endpoints
-standalone_app = FastAPI()
+from _mock_app import make_mock_app
+from _util import json_body
 
-class MessageRequest(BaseModel):
-    message: str
-    model: str = None
 
-class MessageResponse(BaseModel):
-    type: str
-    content: str
-
-@standalone_app.post("/health")
-async def health_check():
-    return {"status": "ok"}
-
-@standalone_app.post("/invoke")
-async def invoke(request: MessageRequest):
-    return MessageResponse(type="ai", content=f"Mock response to: {request.message}")
-
-@standalone_app.post("/feedback")
-async def feedback(request: Request):
-    return {"status": "success"}
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def standalone_client():
-    return TestClient(standalone_app)
+    return TestClient(make_mock_app())
 
 # Test our health endpoint
 def test_health_standalone(standalone_client):
     response = standalone_client.post("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    assert json_body(response) == {"status": "ok"}
 
 # Test our invoke endpoint
 def test_invoke_standalone(standalone_client):
@@ -50,7 +26,7 @@ def test_invoke_standalone(standalone_client):
         json={"message": "What is the weather?", "model": "test-model"}
     )
     assert response.status_code == 200
-    data = response.json()
+    data = json_body(response)
     assert data["type"] == "ai"
     assert "Mock response to:" in data["content"]
     
@@ -65,4 +41,4 @@ def test_feedback_standalone(standalone_client):
         }
     )
     assert response.status_code == 200
-    assert response.json() == {"status": "success"}
\ No newline at end of file
+    assert json_body(response) == {"status": "success"}
\ No newline at end of file